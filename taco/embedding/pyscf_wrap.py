@@ -1,7 +1,6 @@
 """PySCF Utilities for Embedding calculations."""
 
 import numpy as np
-import qcelemental as qcel
 from pyscf import gto
 from pyscf.dft import libxc, gen_grid
 from pyscf.dft.numint import eval_ao, eval_rho, eval_mat
@@ -11,17 +10,9 @@ from taco.methods.scf_pyscf import ScfPyScf
 
 
 def get_charges_and_coords(mol):
-    """Return arrays with charges and coordinates."""
-    bohr2a = qcel.constants.conversion_factor("bohr", "angstrom")
-    coords = []
-    charges = []
-    atm_str = mol.atom.split()
-    for i in range(mol.natm):
-        tmp = [float(f)/bohr2a for f in atm_str[i*4+1:(i*4)+4]]
-        coords.append(tmp)
-        charges.append(mol._atm[i][0])
-    coords = np.array(coords)
-    charges = np.array(charges, dtype=int)
+    """Return arrays with charges and coordinates (in Bohr)."""
+    coords = mol.atom_coords(unit='Bohr')
+    charges = np.array(mol.atom_charges(), dtype=int)
     return charges, coords
 
 
@@ -41,7 +32,7 @@ def get_coulomb(mol1, mol2, dm2):
                   mol2.nbas+mol2.nbas, mol2.nbas+mol2.nbas+mol1.nbas,
                   mol2.nbas+mol2.nbas+mol1.nbas, mol1234.nbas)
     eris = mol1234.intor('int2e', shls_slice=shls_slice)
-    v_coulomb = np.einsum('ab,abcd->cd', dm2, eris)
+    v_coulomb = np.tensordot(dm2, eris, axes=([0, 1], [0, 1]))
     return v_coulomb
 
 
@@ -120,8 +111,8 @@ def compute_nad_terms(mol0, mol1, dm0, dm1, emb_args):
 
     """
     # Create supersystem
-    newatom = '\n'.join([mol0.atom, mol1.atom])
-    system = gto.M(atom=newatom, basis=mol0.basis)
+    newatom = mol0.atom + mol1.atom
+    system = gto.M(atom=newatom, basis=mol0.basis, unit=mol0.unit)
     # Construct grid for complex
     grids = gen_grid.Grids(system)
     grids.level = 4
@@ -192,8 +183,14 @@ def get_pyscf_method(args):
             Basis set name. Any of the PySCF basis sets.
         xc_code : str
             Density functional code, only needed for DFT methods.
+        It may also contain:
+        density_fit : bool or str
+            Use density fitting, optionally with the given auxiliary basis.
+        nthreads : int
+            Number of threads used by PySCF while this method solves its SCF.
     """
-    return ScfPyScf(args['mol'], args['basis'], args['method'], args['xc_code'])
+    return ScfPyScf(args['mol'], args['basis'], args['method'], args['xc_code'],
+                    density_fit=args.get('density_fit', False), nthreads=args.get('nthreads'))
 
 
 class PyScfWrap(QcWrap):
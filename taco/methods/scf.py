@@ -52,22 +52,17 @@ class ScfMethod():
         """Whether it is Restricted case."""
         return self.mol.molecular_multiplicity == 1
 
-    # TODO: probably replace with a @cached_property
     def get_density(self):
-        """Return the DM(s)."""
-        if self.density != []:
-            return self.density
-        else:
+        """Return the DM(s), solving the SCF only if not done yet."""
+        if len(self.density) == 0:
             self.solve_scf(conv_tol=1e-12)
-            return self.density
+        return self.density
 
     def get_energy(self):
-        """Return the SCF energy."""
-        if self.energy.get("scf", 0):
-            return self.energy["scf"]
-        else:
+        """Return the SCF energy, solving the SCF only if not done yet."""
+        if "scf" not in self.energy:
             self.solve_scf(conv_tol=1e-12)
-            return self.energy["scf"]
+        return self.energy["scf"]
 
     def get_fock(self):
         """Contruct Fock matrix."""
@@ -3,8 +3,7 @@ HF method using PySCF.
 """
 
 import numpy as np
-from copy import copy
-from pyscf import scf, gto, dft
+from pyscf import scf, gto, dft, lib
 from taco.methods.scf import ScfMethod
 
 
@@ -19,20 +18,60 @@ def get_pyscf_molecule(mol, basis):
         raise AttributeError("Molecule must have multiplicity.")
     multiplicity = mol.molecular_multiplicity
     spin = multiplicity - 1
-    string = mol.to_string(dtype='xyz')
-    lines = string.splitlines()
-    count = 0
-    for line in lines:
-        if len(line.split(' ')) < 4:
-            count += 1
-    string = '\n'.join(lines[count:])
+    # qcelemental geometries are stored in Bohr
+    atoms = [(sym, tuple(xyz)) for sym, xyz in zip(mol.symbols, mol.geometry.reshape(-1, 3))]
     pyscf_mol = gto.M(
-            atom=string,
+            atom=atoms,
             basis=basis,
-            spin=spin,)
+            spin=spin,
+            unit='Bohr',)
     return pyscf_mol
 
 
+def get_orthogonalizer(ovlp, threshold=1e-7):
+    """Compute the canonical orthogonalization matrix X = U s^{-1/2}.
+
+    Overlap eigenvectors with eigenvalues below `threshold` are dropped,
+    which removes linear dependencies from the basis.
+
+    Parameters
+    ----------
+    ovlp : np.ndarray
+        AO overlap matrix.
+    threshold : float
+        Smallest overlap eigenvalue that is kept.
+    """
+    eigvals, eigvecs = np.linalg.eigh(ovlp)
+    keep = eigvals > threshold
+    return eigvecs[:, keep] / np.sqrt(eigvals[keep])
+
+
+class OrthEigMixin():
+    """Solve the Roothaan equations with a cached orthogonalization matrix.
+
+    The matrix is built once from the overlap and reused for every SCF
+    iteration, so each iteration is a standard symmetric eigenproblem.
+    """
+    _orth = None
+    _orth_ovlp = None
+
+    def eig(self, fock, ovlp, *args, **kwargs):
+        """Solve FC = SCE."""
+        if self._orth is None or not np.array_equal(ovlp, self._orth_ovlp):
+            self._orth_ovlp = np.array(ovlp, copy=True)
+            self._orth = get_orthogonalizer(ovlp)
+        mo_energy, mo_coeff = np.linalg.eigh(self._orth.T @ fock @ self._orth)
+        return mo_energy, self._orth @ mo_coeff
+
+
+class RHF(OrthEigMixin, scf.hf.RHF):
+    """PySCF RHF with a cached orthogonalization matrix."""
+
+
+class RKS(OrthEigMixin, dft.rks.RKS):
+    """PySCF RKS with a cached orthogonalization matrix."""
+
+
 class ScfPyScf(ScfMethod):
     """Base class for method objects.
 
@@ -64,7 +103,7 @@ class ScfPyScf(ScfMethod):
         Add a potential to the Fock matrix.
 
     """
-    def __init__(self, mol, basis, method, xc_code=None):
+    def __init__(self, mol, basis, method, xc_code=None, density_fit=False, nthreads=None):
         """ ScfPyScf object.
 
         Parameters
@@ -77,6 +116,13 @@ class ScfPyScf(ScfMethod):
             Type of SCF method. Available options are:`hf` or `dft`.
         xc_code : string
             Only needed for DFT.
+        density_fit : bool or string
+            Whether to use density fitting for the Coulomb/exchange build.
+            A string is used as the name of the auxiliary basis, `True`
+            selects the `weigend` auxiliary basis.
+        nthreads : int
+            Number of OpenMP threads used by PySCF while this SCF runs.
+            The previous setting is restored afterwards.
         """
         ScfMethod.__init__(self, mol)
         if not isinstance(basis, str):
@@ -86,21 +132,35 @@ class ScfPyScf(ScfMethod):
             if method.lower() == 'dft':
                 if xc_code is None:
                     raise ValueError('DFT functional not specified.')
-                self.scf_object = dft.RKS(self.mol_pyscf)
+                self.scf_object = RKS(self.mol_pyscf)
                 self.scf_object.xc = xc_code
             elif method.lower() == 'hf':
-                self.scf_object = scf.RHF(self.mol_pyscf)
+                self.scf_object = RHF(self.mol_pyscf)
             else:
                 raise ValueError("Unknown method {}.".format(method))
         else:
             # Unrestricted case not implemented
             raise NotImplementedError("Unrestricted SCF not implemented.")
-        # Keep a clean copy of the scf object for latter
-        self._scf_object = copy(self.scf_object)
+        if density_fit:
+            auxbasis = density_fit if isinstance(density_fit, str) else 'weigend'
+            self.scf_object = self.scf_object.density_fit(auxbasis=auxbasis)
+        self.nthreads = nthreads
+        # Unperturbed core Hamiltonian, perturb_fock adds the potential on top of it
+        self._orig_get_hcore = self.scf_object.get_hcore
+        # Revision of the scf object, bumped whenever the Fock matrix changes
+        self._rev = 0
+        self._fock_cache = {}
+
+    def _bump_revision(self):
+        """Invalidate the cached Fock matrix."""
+        self._rev += 1
+        self._fock_cache = {}
 
     def get_fock(self):
-        """Return Fock matrix."""
-        return self.scf_object.get_fock()
+        """Return Fock matrix, built only once per revision."""
+        if self._rev not in self._fock_cache:
+            self._fock_cache[self._rev] = self.scf_object.get_fock()
+        return self._fock_cache[self._rev]
 
     def perturb_fock(self, pot):
         """Add an effective potential to the Fock matrix.
@@ -113,14 +173,29 @@ class ScfPyScf(ScfMethod):
         """
         if not isinstance(pot, np.ndarray):
             raise TypeError("The potential should be given as np.ndarray.")
-        ref = self.scf_object.get_hcore()
-        pot += ref
-        # Override function
-        self.scf_object.get_hcore = lambda *args: pot
+        # Add the potential on top of the unperturbed core Hamiltonian,
+        # without touching the caller's array
+        delta = np.array(pot, copy=True)
+        base = self._orig_get_hcore
+        self.scf_object.get_hcore = lambda *args, **kwargs: base(*args, **kwargs) + delta
+        self._bump_revision()
 
     def restore_scf_object(self):
-        """Recover initial configuration."""
-        self.scf_object = copy(self._scf_object)
+        """Recover initial configuration.
+
+        Only the core Hamiltonian and the SCF results are reset, the rest of
+        the SCF object (e.g. DFT grids) is kept.
+        """
+        # Drop the perturbed get_hcore, falling back to the class method
+        self.scf_object.__dict__.pop('get_hcore', None)
+        self.scf_object.mo_energy = None
+        self.scf_object.mo_coeff = None
+        self.scf_object.mo_occ = None
+        self.scf_object.e_tot = 0
+        self.scf_object.converged = False
+        self.density = []
+        self.energy = {}
+        self._bump_revision()
 
     def solve_scf(self, **scfkwargs):
         """Perform SCF calculation.
@@ -143,8 +218,11 @@ class ScfPyScf(ScfMethod):
             envrionment.
 
         """
-        for attr in scfkwargs:
-            self.scf_object.attr = scfkwargs[attr]
-        self.scf_object.kernel()
+        dm0 = scfkwargs.pop('dm0', None)
+        for attr, val in scfkwargs.items():
+            setattr(self.scf_object, attr, val)
+        with lib.with_omp_threads(self.nthreads):
+            self.scf_object.kernel(dm0=dm0)
+        self._bump_revision()
         self.energy["scf"] = self.scf_object.e_tot
         self.density = self.scf_object.make_rdm1()
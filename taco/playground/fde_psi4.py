@@ -1,11 +1,79 @@
 
 import numpy as np
-from scipy.linalg import block_diag
 
 import psi4
 
 
+CF_TF = 2.8712
+
+
+def compute_kinetic_tf(rho):
+    """Thomas-Fermi kinetic energy functional."""
+    c2 = np.cbrt(rho)**2
+    vt = CF_TF*5./3.*c2
+    et = CF_TF*c2*rho
+    return et, vt
+
+
+def compute_block_densities(phi, lD_all):
+    """Densities and Thomas-Fermi terms on a grid block.
+
+    Parameters
+    ----------
+    phi : np.ndarray((npoints, nlocal), dtype=float)
+        Basis functions evaluated on the block points.
+    lD_all : np.ndarray((ndens, nlocal, nlocal), dtype=float)
+        Local slices of the density matrices.
+
+    Returns
+    -------
+    rho_all, et_all, vt_all : np.ndarray((ndens, npoints), dtype=float)
+        Densities, kinetic energy densities and kinetic potentials.
+
+    """
+    npoints, nlocal = phi.shape
+    ndens = lD_all.shape[0]
+    # One GEMM for all the densities
+    lD_stack = lD_all.transpose(1, 0, 2).reshape(nlocal, ndens*nlocal)
+    half = (phi @ lD_stack).reshape(npoints, ndens, nlocal)
+    rho_all = 2.0 * np.einsum('pkm,pm->kp', half, phi)
+    et_all, vt_all = compute_kinetic_tf(rho_all)
+    return rho_all, et_all, vt_all
+
+
+def assemble_block_potentials(phi, w, v_rho, vt):
+    """Build the XC and kinetic potential matrices of a grid block.
+
+    Parameters
+    ----------
+    phi : np.ndarray((npoints, nlocal), dtype=float)
+        Basis functions evaluated on the block points.
+    w : np.ndarray(npoints, dtype=float)
+        Grid weights.
+    v_rho, vt : np.ndarray(npoints, dtype=float)
+        Non-additive XC and kinetic potentials on the block points.
+
+    Returns
+    -------
+    Vtmp, Vtmp2 : np.ndarray((nlocal, nlocal), dtype=float)
+        Symmetrized XC and kinetic potential matrices of the block.
+
+    """
+    phi_w = phi * w[:, None]
+    Vtmp = (phi_w * v_rho[:, None]).T @ phi
+    Vtmp2 = (phi_w * vt[:, None]).T @ phi
+    return 0.5 * (Vtmp + Vtmp.T), 0.5 * (Vtmp2 + Vtmp2.T)
+
+
 def run_co_h2o_psi4(basis):
+    """Run the CO-in-H2O FDET calculation with psi4.
+
+    Parameters
+    ----------
+    basis : str
+        Basis set name.
+
+    """
     def build_supersystem(mol1, mol2):
         # geom, mass, elem, elez, uniq
         geom1, _, elem1, _, _ = mol1.to_arrays()
@@ -62,7 +130,7 @@ def run_co_h2o_psi4(basis):
     # Electronic repulsion
     mints = psi4.core.MintsHelper(wfn_a)
     eri = mints.ao_eri(bas_b, bas_b, bas_a, bas_a)
-    v_j = np.einsum('ab,abcd->cd', dm_tot_b, eri)
+    v_j = np.tensordot(dm_tot_b, np.asarray(eri), axes=([0, 1], [0, 1]))
 
     # Nuclear-electron attraction
     def compute_nucpot(molb, bas_a):
@@ -81,12 +149,19 @@ def run_co_h2o_psi4(basis):
             The nuclear attraction potential
 
         """
+        natom = molb.natom()
+        charges = np.array([molb.Z(i) for i in range(natom)])
+        geom = np.array(molb.geometry())
+        if molb.units() == 'Angstrom':
+            geom *= psi4.constants.bohr2angstroms
         nuc_potential_b = psi4.core.ExternalPotential()
-        for i in range(molb.natom()):
-            geom = np.array([molb.x(i), molb.y(i), molb.z(i)])
-            if molb.units() == 'Angstrom':
-                geom *= psi4.constants.bohr2angstroms
-            nuc_potential_b.addCharge(molb.Z(i), *geom)
+        if hasattr(nuc_potential_b, 'appendCharges'):
+            # Add all the charges in a single call
+            zxyz = np.column_stack((charges, geom))
+            nuc_potential_b.appendCharges([tuple(row) for row in zxyz])
+        else:
+            for i in range(natom):
+                nuc_potential_b.addCharge(charges[i], *geom[i])
         v_b = nuc_potential_b.computePotentialMatrix(bas_a)
         return v_b
 
@@ -94,13 +169,6 @@ def run_co_h2o_psi4(basis):
     vBnucA = compute_nucpot(co, bas_b)
 
     # DFT nad potential
-    def compute_kinetic_tf(rho):
-        """Thomas-Fermi kinetic energy functional."""
-        cf = 2.8712
-        et = cf*np.power(rho, 5./3.)
-        vt = cf*5/3*np.power(rho, 2./3.)
-        return et, vt
-
     system = build_supersystem(co, h2o)
     basis_obj = psi4.core.BasisSet.build(system, 'ORBITAL', basis)
 
@@ -125,11 +193,12 @@ def run_co_h2o_psi4(basis):
     dma = Da.np
     dmb = Db.np
     len_A = len(dma)
-    dazeros = np.zeros_like(dma)
-    dbzeros = np.zeros_like(dmb)
-    dm_both = block_diag(dma, dmb)
-    dma_sup = block_diag(dma, dbzeros)
-    dmb_sup = block_diag(dazeros, dmb)
+    nbf = len_A + len(dmb)
+    # Total, A and B densities in the supersystem basis, gathered together per block
+    dm_stack = np.zeros((3, nbf, nbf))
+    dm_stack[:2, :len_A, :len_A] = dma
+    dm_stack[::2, len_A:, len_A:] = dmb
+    dm_both = dm_stack[0]
     Dab = psi4.core.Matrix.from_array(dm_both)
     # Set density matrix
     Vpot.set_D([Dab])
@@ -137,38 +206,38 @@ def run_co_h2o_psi4(basis):
     points_func = Vpot.properties()[0]
     points_func.set_pointers(Dab)
 
-    nelec_a = 0
-    nelec_b = 0
-    nelec_tot = 0
-    exc_a = 0
-    exc_b = 0
-    exc_tot = 0
-    et_a = 0
-    et_b = 0
-    et_tot = 0
+    # Integrated (total, A, B) kinetic energies, XC energies and electrons
+    et_acc = np.zeros(3)
+    exc_acc = np.zeros(3)
+    nelec_acc = np.zeros(3)
     V = np.zeros_like(dm_both)
     Vt = np.zeros_like(dm_both)
-    for b in range(len(grid.blocks())):
+    # Flat views, blocks are scattered with linear offsets
+    V_flat = V.reshape(-1)
+    Vt_flat = Vt.reshape(-1)
+
+    blocks = grid.blocks()
+    basis_vals = points_func.basis_values()
+    for block in blocks:
         # Obtain block information
-        block = grid.blocks()[b]
         points_func.compute_points(block)
         npoints = block.npoints()
-        lpos = np.array(block.functions_local_to_global())
+        lpos = np.array(block.functions_local_to_global(), dtype=np.intp)
+        flat_idx = (lpos[:, None]*nbf + lpos).ravel()
         # Obtain the grid weight
-        w = np.array(block.w())
+        w = np.asarray(block.w())
 
-        # Compute phi!
-        phi = np.array(points_func.basis_values()["PHI"])[:npoints, :lpos.shape[0]]
+        # Compute phi! Always copy the used corner: psi4 overwrites the
+        # PHI buffer on the next compute_points call
+        phi = np.array(np.asarray(basis_vals["PHI"])[:npoints, :lpos.shape[0]],
+                       order='C', copy=True)
 
-        # Build a local slice of Densities
-        lD = dm_both[(lpos[:, None], lpos)]
-        lDa = dma_sup[(lpos[:, None], lpos)]
-        lDb = dmb_sup[(lpos[:, None], lpos)]
+        # Build a local slice of Densities, (3, nlocal, nlocal)
+        lD_all = dm_stack[:, lpos[:, None], lpos]
 
-        # Copmute rho
-        rho = 2.0 * np.einsum('pm,mn,pn->p', phi, lD, phi)
-        rhoa = 2.0 * np.einsum('pm,mn,pn->p', phi, lDa, phi)
-        rhob = 2.0 * np.einsum('pm,mn,pn->p', phi, lDb, phi)
+        # Copmute rho and the kinetic terms of the three densities
+        rho_all, et_all, vt_all = compute_block_densities(phi, lD_all)
+        rho, rhoa, rhob = rho_all
 
         inp_ab = {}
         inp_ab["RHO_A"] = psi4.core.Vector.from_array(rho)
@@ -178,45 +247,37 @@ def run_co_h2o_psi4(basis):
         inpb["RHO_A"] = psi4.core.Vector.from_array(rhob)
 
         # Compute the AB functional part
+        # The superfunctional reuses its output buffers on every call,
+        # so keep copies of the npoints values that are needed later
         ret = superfunc.compute_functional(inp_ab, -1)
-        vk_tot = np.array(ret["V"])[:npoints]
-        et, vt = compute_kinetic_tf(rho)
-        et_tot += np.einsum('a,a->', w, et)
-        exc_tot += np.einsum('a,a->', w, vk_tot)
-        v_rho_tot = np.array(ret["V_RHO_A"])[:npoints]
-        vt_tot = vt
+        vk_tot = np.asarray(ret["V"])[:npoints].copy()
+        v_rho_tot = np.asarray(ret["V_RHO_A"])[:npoints].copy()
+        vt_tot = vt_all[0] - vt_all[1]
 
         # Compute the A functional part
         reta = superfunc.compute_functional(inpa, -1)
-        vk_a = np.array(ret["V"])[:npoints]
-        et, vt = compute_kinetic_tf(rhoa)
-        et_a += np.einsum('a,a->', w, et)
-        exc_a += np.einsum('a,a->', w, vk_a)
-        v_rho_a = np.array(reta["V_RHO_A"])[:npoints]
-        vt_tot -= vt
+        vk_a = np.asarray(reta["V"])[:npoints].copy()
+        v_rho_a = np.asarray(reta["V_RHO_A"])[:npoints].copy()
 
         # Compute the B functional part
         retb = superfunc.compute_functional(inpb, -1)
-        vk_b = np.array(retb["V"])[:npoints]
-        et, vt = compute_kinetic_tf(rhob)
-        et_b += np.einsum('a,a->', w, et)
-        exc_b += np.einsum('a,a->', w, vk_b)
-
-        # Do B energy for final evaluation
+        vk_b = np.asarray(retb["V"])[:npoints]
 
-        # This is fine
-        nelec_tot += np.einsum('a,a->', w, rho)
-        nelec_a += np.einsum('a,a->', w, rhoa)
-        nelec_b += np.einsum('a,a->', w, rhob)
+        # Integrate energies and electrons of the block at once
+        stacked = np.vstack([et_all, vk_tot, vk_a, vk_b, rho_all])
+        contribs = stacked @ w
+        et_acc += contribs[:3]
+        exc_acc += contribs[3:6]
+        nelec_acc += contribs[6:]
 
         # Compute the XC derivative.
         v_rho_tot -= v_rho_a
-        Vtmp = np.einsum('pb,p,p,pa->ab', phi, v_rho_tot, w, phi)
-        Vtmp2 = np.einsum('pb,p,p,pa->ab', phi, vt_tot, w, phi)
+        Vtmp, Vtmp2 = assemble_block_potentials(phi, w, v_rho_tot, vt_tot)
 
-        # Add the temporary back to the larger array by indexing, ensure it is symmetric
-        V[(lpos[:, None], lpos)] += 0.5 * (Vtmp + Vtmp.T)
-        Vt[(lpos[:, None], lpos)] += 0.5 * (Vtmp2 + Vtmp2.T)
+        # Add the temporary back to the larger array by indexing,
+        # local functions are unique within a block so a buffered add is safe
+        V_flat[flat_idx] += Vtmp.ravel()
+        Vt_flat[flat_idx] += Vtmp2.ravel()
 
     # initialize dictionary
     embdic = {}
@@ -225,8 +286,8 @@ def run_co_h2o_psi4(basis):
     vt_nad = Vt[:len_A, :len_A]
     int_ref_xc = 2*np.einsum('ab,ba', vxc_nad, dma)
     int_ref_t = 2*np.einsum('ab,ba', vt_nad, dma)
-    embdic['exc_nad'] = exc_tot - exc_a - exc_b
-    embdic['et_nad'] = et_tot - et_a - et_b
+    embdic['exc_nad'] = exc_acc[0] - exc_acc[1] - exc_acc[2]
+    embdic['et_nad'] = et_acc[0] - et_acc[1] - et_acc[2]
 
     # Re-evaluate HF
     base_wfn = psi4.core.Wavefunction.build(co)
@@ -4,9 +4,10 @@ Test method objects.
 import pytest
 import numpy as np
 from qcelemental.models import Molecule
+from pyscf import lib
 
 from taco.methods.scf import ScfMethod
-from taco.methods.scf_pyscf import ScfPyScf
+from taco.methods.scf_pyscf import ScfPyScf, get_orthogonalizer
 from taco.testdata.cache import cache
 
 
@@ -48,6 +49,18 @@ def test_pyscf_base():
         ScfPyScf(mol, basis2, method2)
 
 
+def test_orthogonalizer():
+    """Test canonical orthogonalization matrix."""
+    ovlp = np.array([[1.0, 0.3], [0.3, 1.0]])
+    x = get_orthogonalizer(ovlp)
+    np.testing.assert_allclose(x.T @ ovlp @ x, np.eye(2), atol=1e-12)
+    # Linearly dependent functions are removed
+    ovlp = np.array([[1.0, 1.0], [1.0, 1.0]])
+    x = get_orthogonalizer(ovlp)
+    assert x.shape == (2, 1)
+    np.testing.assert_allclose(x.T @ ovlp @ x, np.eye(1), atol=1e-12)
+
+
 def test_hf_co_sto3g():
     """Test functions of ScfPyScf class."""
     mol = Molecule.from_data("""C        -3.6180905689    1.3768035675   -0.0207958979
@@ -56,21 +69,35 @@ def test_hf_co_sto3g():
     method = 'hf'
     hf = ScfPyScf(mol, basis, method)
     hf.solve_scf(conv_tol=1e-12)
+    assert hf.scf_object.conv_tol == 1e-12
     dm0 = hf.get_density()
     nao_co = len(dm0)
     ref_dm0 = np.loadtxt(cache.files["co_h2o_sto3g_dma"]).reshape((nao_co, nao_co))
     np.testing.assert_allclose(ref_dm0*2, dm0, atol=1e-6)
     unperturbed_fock = hf.get_fock()
+    assert hf.get_fock() is unperturbed_fock
     assert 'scf' in hf.energy
     assert abs(hf.energy["scf"] - -111.22516947) < 1e-7
     vemb = np.zeros_like(dm0)
     hf.perturb_fock(vemb)
+    assert hf.get_fock() is not unperturbed_fock
     hf.solve_scf()
     dm0_again = hf.get_density()
     np.testing.assert_allclose(ref_dm0*2, dm0_again, atol=1e-6)
     assert abs(hf.energy["scf"] - -111.22516947) < 1e-7
     perturbed_fock = hf.get_fock()
     np.testing.assert_allclose(unperturbed_fock, perturbed_fock, atol=1e-9)
+    hcore = hf.scf_object.get_hcore()
+    vones = np.ones_like(dm0)
+    hf.perturb_fock(vones)
+    hf.perturb_fock(vones)
+    np.testing.assert_allclose(vones, np.ones_like(dm0))
+    np.testing.assert_allclose(hcore + 1.0, hf.scf_object.get_hcore(), atol=1e-12)
+    hf.restore_scf_object()
+    np.testing.assert_allclose(hcore, hf.scf_object.get_hcore(), atol=1e-12)
+    assert hf.scf_object.mo_coeff is None
+    assert not hf.scf_object.converged
+    assert hf.density == []
 
 
 def test_dft_co_sto3g():
@@ -92,10 +119,40 @@ def test_dft_co_sto3g():
     assert abs(dft.energy["scf"] - -110.86517923) < 1e-5
     perturbed_fock = dft.get_fock()
     np.testing.assert_allclose(unperturbed_fock, perturbed_fock, atol=1e-9)
+    dft.restore_scf_object()
+    # The DFT grids are kept
+    assert dft.scf_object.grids.coords is not None
+
+
+def test_dft_co_sto3g_density_fit():
+    """Test density fitting in ScfPyScf."""
+    mol = Molecule.from_data("""C        -3.6180905689    1.3768035675   -0.0207958979
+                                O        -4.7356838533    1.5255563000    0.1150239130""")
+    dft = ScfPyScf(mol, 'sto-3g', 'dft', 'LDA,VWN', density_fit=True)
+    assert dft.scf_object.with_df.auxbasis == 'weigend'
+    dft.solve_scf(conv_tol=1e-12)
+    assert abs(dft.get_energy() - -110.86622414) < 1e-6
+
+
+def test_pyscf_nthreads():
+    """Test that nthreads only applies while the SCF runs."""
+    mol = Molecule.from_data("""C        -3.6180905689    1.3768035675   -0.0207958979
+                                O        -4.7356838533    1.5255563000    0.1150239130""")
+    nthreads0 = lib.num_threads()
+    hf = ScfPyScf(mol, 'sto-3g', 'hf', nthreads=nthreads0 + 1)
+    assert lib.num_threads() == nthreads0
+    used = []
+    hf.solve_scf(callback=lambda envs: used.append(lib.num_threads()))
+    assert used
+    assert all(n == nthreads0 + 1 for n in used)
+    assert lib.num_threads() == nthreads0
 
 
 if __name__ == "__main__":
     test_scfmethod()
     test_pyscf_base()
+    test_orthogonalizer()
     test_hf_co_sto3g()
     test_dft_co_sto3g()
+    test_dft_co_sto3g_density_fit()
+    test_pyscf_nthreads()